@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-timestamp', '-id'], name='network_pos_timesta_c7c5cc_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0002_post_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='network_pos_user_id_868769_idx'),
+        ),
+    ]
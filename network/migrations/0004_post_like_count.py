@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-15 08:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_counts(apps, schema_editor):
+    Post = apps.get_model('network', 'Post')
+    Like = apps.get_model('network', 'Like')
+    likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+        count=Count('pk')
+    ).values('count')
+    Post.objects.update(like_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0003_post_user_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-15 08:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    User = apps.get_model('network', 'User')
+    Follow = apps.get_model('network', 'Follow')
+    followers = Follow.objects.filter(following=OuterRef('pk')).order_by().values('following').annotate(
+        count=Count('pk')
+    ).values('count')
+    following = Follow.objects.filter(follower=OuterRef('pk')).order_by().values('follower').annotate(
+        count=Count('pk')
+    ).values('count')
+    User.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        following_count=Coalesce(Subquery(following), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0004_post_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -3,19 +3,25 @@ from django.db import models
 
 
 class User(AbstractUser):
-    pass
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
 
 class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    like_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return f"Post by {self.user.username} at {self.timestamp}"
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id']),
+            models.Index(fields=['user', '-timestamp', '-id']),
+        ]
 
 
 class Like(models.Model):
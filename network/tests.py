@@ -1,3 +1,369 @@
-from django.test import TestCase
+from base64 import urlsafe_b64encode
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, Post, Like, Follow
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def make_cursor(token):
+    return urlsafe_b64encode(token.encode()).decode()
+
+
+class MigrationTestCase(TransactionTestCase):
+    # Migrates the network app back to migrate_from before each test; the
+    # test populates rows through self.apps and then calls self.migrate()
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes("network")
+        executor.migrate([("network", self.migrate_from)])
+        self.apps = executor.loader.project_state([("network", self.migrate_from)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.latest)
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("network", self.migrate_to)])
+        return executor.loader.project_state([("network", self.migrate_to)]).apps
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "password")
+        self.author = User.objects.create_user("bob", "bob@example.com", "password")
+        self.client.force_login(self.user)
+
+        # 25 posts sharing timestamps in groups of three, so page boundaries
+        # fall inside a tie and have to be broken by pk
+        start = timezone.now() - timedelta(days=1)
+        for i in range(25):
+            post = Post.objects.create(user=self.author, content=f"Post {i}")
+            Post.objects.filter(pk=post.pk).update(timestamp=start + timedelta(minutes=i // 3))
+        self.expected = list(
+            Post.objects.order_by('-timestamp', '-pk').values_list('pk', flat=True)
+        )
+
+    def get_page(self, url, cursor=None):
+        response = self.client.get(url, {"cursor": cursor} if cursor is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def page_ids(self, page):
+        return [post.pk for post in page]
+
+    def test_walks_forward_and_back(self):
+        pages = [self.get_page(reverse("index"))]
+        while pages[-1].has_next:
+            pages.append(self.get_page(reverse("index"), pages[-1].next_cursor))
+
+        forward = [self.page_ids(page) for page in pages]
+        self.assertEqual([len(ids) for ids in forward], [10, 10, 5])
+        self.assertEqual(sum(forward, []), self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertTrue(pages[1].has_previous and pages[1].has_next)
+        self.assertFalse(pages[-1].has_next)
+
+        backward = [pages[-1]]
+        while backward[-1].has_previous:
+            backward.append(self.get_page(reverse("index"), backward[-1].previous_cursor))
+        self.assertEqual([self.page_ids(page) for page in reversed(backward)], forward)
+
+    def test_profile_and_following_use_cursors(self):
+        Follow.objects.create(follower=self.user, following=self.author)
+        for url in (reverse("profile", args=["bob"]), reverse("following")):
+            first = self.get_page(url)
+            second = self.get_page(url, first.next_cursor)
+            self.assertEqual(self.page_ids(first) + self.page_ids(second), self.expected[:20])
+
+    def test_malformed_cursor_shows_first_page(self):
+        cursors = [
+            "",
+            "garbage",
+            make_cursor("n|2020-01-01T00:00:00+00:00"),
+            make_cursor("x|2020-01-01T00:00:00+00:00|1"),
+            make_cursor("n|not-a-date|1"),
+            make_cursor("n|2020-01-01T00:00:00+00:00|abc"),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = self.get_page(reverse("index"), cursor)
+                self.assertEqual(self.page_ids(page), self.expected[:10])
+                self.assertFalse(page.has_previous)
+                # Junk cursors share the first page's fragment cache entry
+                self.assertEqual(page.position, "")
+
+    def test_position_is_normalized_cursor(self):
+        first = self.get_page(reverse("index"))
+        second = self.get_page(reverse("index"), first.next_cursor)
+        last = first.object_list[-1]
+        self.assertEqual(second.position, f"n|{last.timestamp.isoformat()}|{last.pk}")
+
+    def test_cursor_past_either_end_shows_first_page(self):
+        cursors = [
+            make_cursor("n|2000-01-01T00:00:00+00:00|1"),
+            make_cursor("p|2999-01-01T00:00:00+00:00|1"),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = self.get_page(reverse("index"), cursor)
+                self.assertEqual(self.page_ids(page), self.expected[:10])
+                self.assertFalse(page.has_previous)
+                self.assertTrue(page.has_next)
+
+    def test_stale_cursor_after_unfollow(self):
+        Follow.objects.create(follower=self.user, following=self.author)
+        next_cursor = self.get_page(reverse("following")).next_cursor
+        Follow.objects.filter(follower=self.user, following=self.author).delete()
+
+        page = self.get_page(reverse("following"), next_cursor)
+        self.assertEqual(self.page_ids(page), [])
+        self.assertFalse(page.has_other_pages())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LikeCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("alice", "alice@example.com", "password")
+        self.fans = [
+            User.objects.create_user(f"fan{i}", f"fan{i}@example.com", "password")
+            for i in range(2)
+        ]
+        self.post = Post.objects.create(user=self.author, content="Hello")
+
+    def toggle(self, user):
+        self.client.force_login(user)
+        response = self.client.post(reverse("like_post", args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertLikeCount(self, expected, data):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, expected)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), expected)
+        self.assertEqual(data["like_count"], expected)
+
+    def test_like_and_unlike_adjust_count_by_one(self):
+        data = self.toggle(self.fans[0])
+        self.assertTrue(data["is_liked"])
+        self.assertLikeCount(1, data)
+
+        data = self.toggle(self.fans[1])
+        self.assertTrue(data["is_liked"])
+        self.assertLikeCount(2, data)
+
+        data = self.toggle(self.fans[0])
+        self.assertFalse(data["is_liked"])
+        self.assertLikeCount(1, data)
+
+        data = self.toggle(self.fans[1])
+        self.assertFalse(data["is_liked"])
+        self.assertLikeCount(0, data)
+
+    def test_like_missing_post(self):
+        self.client.force_login(self.fans[0])
+        response = self.client.post(reverse("like_post", args=[self.post.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_shows_stored_count(self):
+        self.toggle(self.fans[0])
+        response = self.client.get(reverse("index"))
+        post = response.context["page_obj"].object_list[0]
+        self.assertEqual(post.like_count, 1)
+        self.assertTrue(post.is_liked)
+
+
+class LikeCountBackfillTests(MigrationTestCase):
+    migrate_from = "0003_post_user_timestamp_index"
+    migrate_to = "0004_post_like_count"
+
+    def test_backfills_like_counts(self):
+        User = self.apps.get_model("network", "User")
+        Post = self.apps.get_model("network", "Post")
+        Like = self.apps.get_model("network", "Like")
+        users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        popular = Post.objects.create(user=users[0], content="Popular")
+        single = Post.objects.create(user=users[0], content="Single")
+        unliked = Post.objects.create(user=users[0], content="Unliked")
+        for user in users:
+            Like.objects.create(user=user, post=popular)
+        Like.objects.create(user=users[1], post=single)
+
+        Post = self.migrate().get_model("network", "Post")
+        counts = dict(Post.objects.values_list("pk", "like_count"))
+        self.assertEqual(counts, {popular.pk: 3, single.pk: 1, unliked.pk: 0})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FollowCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", "alice@example.com", "password")
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.carol = User.objects.create_user("carol", "carol@example.com", "password")
+
+    def toggle(self, follower, username):
+        self.client.force_login(follower)
+        response = self.client.post(reverse("follow", args=[username]))
+        self.assertRedirects(response, reverse("profile", args=[username]))
+
+    def assertCounts(self, user, followers, following):
+        user.refresh_from_db()
+        self.assertEqual(user.followers_count, followers)
+        self.assertEqual(user.following_count, following)
+        self.assertEqual(Follow.objects.filter(following=user).count(), followers)
+        self.assertEqual(Follow.objects.filter(follower=user).count(), following)
+
+    def test_follow_and_unfollow_adjust_counts_by_one(self):
+        self.toggle(self.alice, "bob")
+        self.assertCounts(self.alice, 0, 1)
+        self.assertCounts(self.bob, 1, 0)
+
+        self.toggle(self.carol, "bob")
+        self.toggle(self.alice, "carol")
+        self.assertCounts(self.alice, 0, 2)
+        self.assertCounts(self.bob, 2, 0)
+        self.assertCounts(self.carol, 1, 1)
+
+        self.toggle(self.alice, "bob")
+        self.assertCounts(self.alice, 0, 1)
+        self.assertCounts(self.bob, 1, 0)
+        self.assertCounts(self.carol, 1, 1)
+
+    def test_follow_self_is_ignored(self):
+        self.toggle(self.alice, "alice")
+        self.assertCounts(self.alice, 0, 0)
+
+    def test_profile_shows_stored_counts(self):
+        self.toggle(self.alice, "bob")
+        response = self.client.get(reverse("profile", args=["bob"]))
+        self.assertEqual(response.context["followers_count"], 1)
+        self.assertEqual(response.context["following_count"], 0)
+        self.assertTrue(response.context["is_following"])
+
+
+class FollowCountBackfillTests(MigrationTestCase):
+    migrate_from = "0004_post_like_count"
+    migrate_to = "0005_user_follow_counts"
+
+    def test_backfills_follow_counts(self):
+        User = self.apps.get_model("network", "User")
+        Follow = self.apps.get_model("network", "Follow")
+        alice = User.objects.create(username="alice")
+        bob = User.objects.create(username="bob")
+        carol = User.objects.create(username="carol")
+        dave = User.objects.create(username="dave")
+        Follow.objects.create(follower=alice, following=bob)
+        Follow.objects.create(follower=carol, following=bob)
+        Follow.objects.create(follower=alice, following=carol)
+
+        User = self.migrate().get_model("network", "User")
+        counts = {
+            user.pk: (user.followers_count, user.following_count)
+            for user in User.objects.all()
+        }
+        self.assertEqual(counts, {
+            alice.pk: (0, 2),
+            bob.pk: (2, 0),
+            carol.pk: (1, 1),
+            dave.pk: (0, 0),
+        })
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FeedVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "password")
+        self.other = User.objects.create_user("bob", "bob@example.com", "password")
+        self.post = Post.objects.create(user=self.user, content="Hello")
+        self.client.force_login(self.user)
+
+    def assertBumpedOnCommit(self, method, url, **kwargs):
+        before = self.client.get(reverse("index")).context["feed_version"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            getattr(self.client, method)(url, **kwargs)
+            # Not visible until the view's transaction commits
+            self.assertEqual(self.client.get(reverse("index")).context["feed_version"], before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(self.client.get(reverse("index")).context["feed_version"], before)
+
+    def test_like_bumps_version_after_commit(self):
+        self.assertBumpedOnCommit("post", reverse("like_post", args=[self.post.pk]))
+
+    def test_follow_bumps_version_after_commit(self):
+        self.assertBumpedOnCommit("post", reverse("follow", args=["bob"]))
+
+    def test_edit_bumps_version_after_commit(self):
+        self.assertBumpedOnCommit(
+            "post", reverse("edit_post", args=[self.post.pk]),
+            data='{"content": "Edited"}', content_type="application/json"
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EditPostTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("alice", "alice@example.com", "password")
+        self.other = User.objects.create_user("bob", "bob@example.com", "password")
+        self.post = Post.objects.create(user=self.owner, content="Hello")
+
+    def edit(self, user, post_id, body):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse("edit_post", args=[post_id]), data=body, content_type="application/json"
+        )
+
+    def assertUnchanged(self):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content, "Hello")
+
+    def test_owner_can_edit(self):
+        response = self.edit(self.owner, self.post.pk, '{"content": "  Edited  "}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content, "Edited")
+
+    def test_other_users_post_is_forbidden(self):
+        for body in ('{"content": "Hijacked"}', '{"content": ""}', 'notjson'):
+            with self.subTest(body=body):
+                response = self.edit(self.other, self.post.pk, body)
+                self.assertEqual(response.status_code, 403)
+                self.assertUnchanged()
+
+    def test_missing_post_is_not_found(self):
+        for body in ('{"content": "Edited"}', '{"content": ""}', 'notjson'):
+            with self.subTest(body=body):
+                response = self.edit(self.owner, self.post.pk + 1, body)
+                self.assertEqual(response.status_code, 404)
+
+    def test_bad_payload_on_own_post(self):
+        for body in ('{"content": "   "}', '{}', 'notjson', '[1, 2]', '{"content": 5}'):
+            with self.subTest(body=body):
+                response = self.edit(self.owner, self.post.pk, body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+                self.assertUnchanged()
@@ -1,40 +1,170 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
-from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from django.views.decorators.cache import cache_page
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from functools import wraps
+import binascii
 import json
+import time
 
 from .models import User, Post, Like, Follow
 
 
+def annotate_likes(posts, user):
+    # Attach the current user's like status to each post
+    if user.is_authenticated:
+        posts = posts.annotate(is_liked=Exists(
+            Like.objects.filter(user=user, post=OuterRef('pk'))
+        ))
+    return posts
+
+
+def cache_page_for_anonymous(timeout):
+    # Like cache_page, but signed-in users always get a freshly rendered page
+    def decorator(view):
+        cached_view = cache_page(timeout)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def feed_version(user):
+    # Part of the feed fragment cache key; bumping it drops the user's cached feeds
+    return cache.get_or_set(f"feed-version:{user.pk}", time.time_ns, None)
+
+
+def bump_feed_version(user):
+    cache.set(f"feed-version:{user.pk}", time.time_ns(), None)
+
+
+class KeysetPage:
+    # Rows are fetched on first access, so a feed served from the fragment
+    # cache never queries the posts at all. position is the normalized cursor
+    # ("" for the first page) and is what the fragment cache is keyed on.
+    def __init__(self, posts, size, direction, first_page=None, position=""):
+        self.posts = posts
+        self.size = size
+        self.direction = direction
+        self.first_page = first_page
+        self.position = position
+
+    @cached_property
+    def _page(self):
+        rows = list(self.posts[:self.size + 1])
+        direction = self.direction
+        if not rows and self.first_page is not None:
+            # The cursor points past either end of the feed (e.g. its posts
+            # are gone), so start over from the newest posts
+            rows = list(self.first_page[:self.size + 1])
+            direction = None
+        has_more = len(rows) > self.size
+        rows = rows[:self.size]
+        if direction == "p":
+            # Walking backwards: rows came back oldest first
+            return rows[::-1], True, has_more
+        return rows, has_more, direction == "n"
+
+    @property
+    def object_list(self):
+        return self._page[0]
+
+    @property
+    def has_next(self):
+        return self._page[1]
+
+    @property
+    def has_previous(self):
+        return self._page[2]
+
+    @property
+    def next_cursor(self):
+        return encode_cursor("n", self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor("p", self.object_list[0]) if self.has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def encode_cursor(direction, post):
+    token = f"{direction}|{post.timestamp.isoformat()}|{post.pk}"
+    return urlsafe_b64encode(token.encode()).decode()
+
+
+def decode_cursor(cursor):
+    # Returns (direction, timestamp, pk), or None for a missing or malformed cursor
+    try:
+        direction, timestamp, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if direction not in ("n", "p"):
+            return None
+        return direction, datetime.fromisoformat(timestamp), int(pk)
+    except (AttributeError, binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def keyset_page(posts, cursor, size=10):
+    # Seek from the cursor position instead of using OFFSET, so every page
+    # costs the same regardless of how deep it is. The pk breaks timestamp ties.
+    first_page = posts.order_by('-timestamp', '-pk')
+    decoded = decode_cursor(cursor)
+    if decoded is None:
+        return KeysetPage(first_page, size, None)
+
+    direction, timestamp, pk = decoded
+    position = f"{direction}|{timestamp.isoformat()}|{pk}"
+    if direction == "n":
+        posts = posts.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+        return KeysetPage(posts.order_by('-timestamp', '-pk'), size, direction, first_page, position)
+
+    # Walking backwards: fetch the newer posts in ascending order, then flip them
+    posts = posts.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk))
+    return KeysetPage(posts.order_by('timestamp', 'pk'), size, direction, first_page, position)
+
+
+@cache_page_for_anonymous(30)
 def index(request):
     # Handle new post creation
     if request.method == "POST" and request.user.is_authenticated:
         content = request.POST.get("content", "").strip()
         if content:
             Post.objects.create(user=request.user, content=content)
+            bump_feed_version(request.user)
             return HttpResponseRedirect(reverse("index"))
     
     # Get all posts
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('user').only(
+        'id', 'content', 'timestamp', 'like_count', 'user__id', 'user__username'
+    )
+    posts = annotate_likes(posts, request.user)
     
     # Pagination
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get likes for current user if authenticated
-    user_likes = set()
-    if request.user.is_authenticated:
-        user_likes = set(Like.objects.filter(user=request.user).values_list('post_id', flat=True))
+    page_obj = keyset_page(posts, request.GET.get('cursor'))
     
     return render(request, "network/index.html", {
         "page_type": "all",
         "page_obj": page_obj,
-        "user_likes": user_likes
+        "feed_version": feed_version(request.user)
     })
 
 
@@ -79,7 +209,6 @@ def register(request):
         # Attempt to create new user
         try:
             user = User.objects.create_user(username, email, password)
-            user.save()
         except IntegrityError:
             return render(request, "network/register.html", {
                 "message": "Username already taken."
@@ -92,42 +221,36 @@ def register(request):
 
 @login_required
 def profile(request, username):
-    profile_user = get_object_or_404(User, username=username)
-    
-    # Get follower and following counts
-    followers_count = Follow.objects.filter(following=profile_user).count()
-    following_count = Follow.objects.filter(follower=profile_user).count()
+    # Fetch the profile user along with whether the current user follows them
+    profile_user = get_object_or_404(
+        User.objects.annotate(is_followed_by_me=Exists(
+            Follow.objects.filter(follower=request.user, following=OuterRef('pk'))
+        )),
+        username=username
+    )
     
     # Get all posts by this user
-    posts = Post.objects.filter(user=profile_user)
+    posts = Post.objects.filter(user=profile_user).select_related('user').only(
+        'id', 'content', 'timestamp', 'like_count', 'user__id', 'user__username'
+    )
+    posts = annotate_likes(posts, request.user)
     
     # Pagination
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Check if current user follows this profile user
-    is_following = False
-    if request.user.is_authenticated and request.user != profile_user:
-        is_following = Follow.objects.filter(follower=request.user, following=profile_user).exists()
-    
-    # Get likes for current user if authenticated
-    user_likes = set()
-    if request.user.is_authenticated:
-        user_likes = set(Like.objects.filter(user=request.user).values_list('post_id', flat=True))
+    page_obj = keyset_page(posts, request.GET.get('cursor'))
     
     return render(request, "network/index.html", {
         "page_type": "profile",
         "profile_user": profile_user,
-        "followers_count": followers_count,
-        "following_count": following_count,
+        "followers_count": profile_user.followers_count,
+        "following_count": profile_user.following_count,
         "page_obj": page_obj,
-        "is_following": is_following,
-        "user_likes": user_likes
+        "feed_version": feed_version(request.user),
+        "is_following": profile_user.is_followed_by_me
     })
 
 
 @login_required
+@transaction.atomic
 def follow(request, username):
     if request.method == "POST":
         profile_user = get_object_or_404(User, username=username)
@@ -136,15 +259,25 @@ def follow(request, username):
         if request.user == profile_user:
             return HttpResponseRedirect(reverse("profile", args=[username]))
         
-        # Toggle follow status
-        follow_obj, created = Follow.objects.get_or_create(
-            follower=request.user,
-            following=profile_user
-        )
+        # Toggle follow status: unfollow if a follow was deleted, otherwise
+        # follow. Both users' counts are adjusted in the view's transaction.
+        deleted, _ = Follow.objects.filter(follower=request.user, following=profile_user).delete()
+        if deleted:
+            delta = -1
+        else:
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(follower=request.user, following=profile_user)
+                delta = 1
+            except IntegrityError:
+                # A concurrent request already followed
+                delta = 0
+        
+        if delta:
+            User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + delta)
+            User.objects.filter(pk=profile_user.pk).update(followers_count=F('followers_count') + delta)
         
-        if not created:
-            # If it already exists, unfollow
-            follow_obj.delete()
+        transaction.on_commit(lambda: bump_feed_version(request.user))
         
         return HttpResponseRedirect(reverse("profile", args=[username]))
     
@@ -153,72 +286,84 @@ def follow(request, username):
 
 @login_required
 def following(request):
-    # Get all users that the current user follows
-    following_users = Follow.objects.filter(follower=request.user).values_list('following', flat=True)
-    
-    # Get all posts from users that the current user follows
-    posts = Post.objects.filter(user__in=following_users)
+    # Get all posts from users that the current user follows, joining
+    # through Follow so it all runs as a single statement
+    posts = Post.objects.filter(user__followers__follower=request.user).select_related('user').only(
+        'id', 'content', 'timestamp', 'like_count', 'user__id', 'user__username'
+    )
+    posts = annotate_likes(posts, request.user)
     
     # Pagination
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get likes for current user
-    user_likes = set(Like.objects.filter(user=request.user).values_list('post_id', flat=True))
+    page_obj = keyset_page(posts, request.GET.get('cursor'))
     
     return render(request, "network/index.html", {
         "page_type": "following",
         "page_obj": page_obj,
-        "user_likes": user_likes
+        "feed_version": feed_version(request.user)
     })
 
 
 @login_required
+@transaction.atomic
 def edit_post(request, post_id):
     if request.method != "POST":
         return JsonResponse({"error": "POST request required."}, status=400)
     
-    post = get_object_or_404(Post, pk=post_id)
-    
-    # Security: ensure user can only edit their own posts
-    if post.user != request.user:
-        return JsonResponse({"error": "You can only edit your own posts."}, status=403)
-    
-    data = json.loads(request.body)
-    content = data.get("content", "").strip()
+    try:
+        content = json.loads(request.body).get("content", "").strip()
+        error = None if content else "Content cannot be empty."
+    except (ValueError, AttributeError):
+        content, error = "", "Invalid JSON body."
     
-    if not content:
-        return JsonResponse({"error": "Content cannot be empty."}, status=400)
+    # Security: the user filter ensures users can only edit their own posts
+    updated = 0
+    if not error:
+        updated = Post.objects.filter(pk=post_id, user=request.user).update(content=content)
+    if not updated:
+        # A missing or someone else's post is reported ahead of a bad payload
+        owner_id = Post.objects.filter(pk=post_id).values_list('user_id', flat=True).first()
+        if owner_id is None:
+            raise Http404("No Post matches the given query.")
+        if owner_id != request.user.pk:
+            return JsonResponse({"error": "You can only edit your own posts."}, status=403)
+        return JsonResponse({"error": error}, status=400)
     
-    post.content = content
-    post.save()
+    transaction.on_commit(lambda: bump_feed_version(request.user))
     
-    return JsonResponse({"message": "Post updated successfully.", "content": post.content})
+    return JsonResponse({"message": "Post updated successfully.", "id": post_id})
 
 
 @login_required
+@transaction.atomic
 def like_post(request, post_id):
     if request.method != "POST":
         return JsonResponse({"error": "POST request required."}, status=400)
     
-    post = get_object_or_404(Post, pk=post_id)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404("No Post matches the given query.")
     
-    # Toggle like
-    like_obj, created = Like.objects.get_or_create(
-        user=request.user,
-        post=post
-    )
-    
-    if not created:
-        # If it already exists, unlike
-        like_obj.delete()
-        is_liked = False
+    # Toggle like: unlike if a like was deleted, otherwise like. The post's
+    # like_count is adjusted in the view's transaction so it can't drift.
+    deleted, _ = Like.objects.filter(user=request.user, post_id=post_id).delete()
+    if deleted:
+        delta = -1
     else:
-        is_liked = True
+        try:
+            with transaction.atomic():
+                Like.objects.create(user=request.user, post_id=post_id)
+            delta = 1
+        except IntegrityError:
+            # A concurrent request already liked it
+            delta = 0
+    
+    if delta:
+        Post.objects.filter(pk=post_id).update(like_count=F('like_count') + delta)
+    is_liked = not deleted
+    
+    transaction.on_commit(lambda: bump_feed_version(request.user))
     
     # Get updated like count
-    like_count = post.likes.count()
+    like_count = Post.objects.values_list('like_count', flat=True).get(pk=post_id)
     
     return JsonResponse({
         "is_liked": is_liked,
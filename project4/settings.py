@@ -78,11 +78,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Reuse connections across requests instead of reconnecting each time
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 AUTH_USER_MODEL = "network.User"
 
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# Feed invalidation bumps per-user version keys, so deployments running more
+# than one worker process must share the cache: set REDIS_URL (requires the
+# `redis` package). Without it each process keeps its own local-memory cache,
+# which is only coherent for a single-process server such as runserver.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 